@@ -1,7 +1,189 @@
 import re
+import sys
+
+# Parsing a rule re-lexes and re-compiles its regexes, so repeated loads of the
+# same definition text are pure overhead. Remember the built rule per stripped
+# definition string; cap the cache FIFO-style so it can't grow without bound.
+_PARSE_CACHE = {}
+_PARSE_CACHE_MAX = 1024
+
+# Large rule banks repeat the same backtick literal across many rules; compile
+# each distinct leaf once and share the Pattern object. Unlike re's internal
+# cache this never evicts, and sharing also helps the union/prescreen tables.
+_REGEX_CACHE = {}
+
+# Opcodes for the flat rule interpreter. Rules are compiled to a postfix
+# program over a small value stack instead of being walked recursively; the
+# jump opcodes give AND/OR their short-circuit behavior.
+_OP_SEARCH = 0          # arg = regex index; push regexes[arg].search(content)
+_OP_JUMP_IF_FALSE = 1   # arg = target; jump if top of stack is falsy, else pop
+_OP_JUMP_IF_TRUE = 2    # arg = target; jump if top of stack is truthy, else pop
+_OP_NOT = 3             # push not pop()
+_OP_FROM = 4            # pop a match; push the evidence it captured, or None
+_OP_SEARCH_BOOL = 5     # arg = regex index; push whether the regex matched
+
+
+# Characters that mean themselves in a regex; runs of these are literal text
+# that must appear in any match.
+_LITERAL_RUN_PAT = re.compile(r'[A-Za-z0-9_ \t@#%&<>,;:=/!~-]+')
+
+
+def _extract_literal(pattern):
+    """
+    Return the longest substring that pattern provably requires in content
+    (lowercased, for case-blind prescreening), or None. Conservative: any
+    construct that could make a run optional (groups, alternation, classes,
+    escapes) disqualifies the whole pattern.
+    """
+    if ('(' in pattern or '|' in pattern or '[' in pattern or '\\' in pattern
+            or '{' in pattern):
+        return None
+    best = ''
+    for m in _LITERAL_RUN_PAT.finditer(pattern):
+        run = m.group(0)
+        nxt = pattern[m.end():m.end() + 1]
+        if nxt == '?' or nxt == '*':
+            # a trailing quantifier makes the last char of the run optional
+            run = run[:-1]
+        if len(run) > len(best):
+            best = run
+    return best.lower() if len(best) >= 3 else None
+
+
+def _run(code, searches, literals, content, lower=None, union_hits=None, union_keys=None):
+    """
+    Execute a compiled rule program against content. Shared by
+    ScanRule.__call__ and ScanRule.scan_all so the batch path can stream
+    straight out of the class-level arrays without per-rule attribute loads.
+    scan_all passes a pre-lowered copy of content so the literal prescreen
+    lowers it once per content rather than once per rule.
+    """
+    # opcode constants as locals: LOAD_FAST in the dispatch chain instead of
+    # a module-global lookup per comparison
+    op_search = _OP_SEARCH
+    op_search_bool = _OP_SEARCH_BOOL
+    op_jump_if_false = _OP_JUMP_IF_FALSE
+    op_jump_if_true = _OP_JUMP_IF_TRUE
+    op_not = _OP_NOT
+    stk = []
+    push = stk.append
+    pop = stk.pop
+    n = len(code)
+    pc = 0
+    while pc < n:
+        op, arg = code[pc]
+        pc += 1
+        if op == op_search or op == op_search_bool:
+            if union_hits is not None and op == op_search_bool:
+                # A union hit proves the leaf occurs in the content. A miss
+                # proves nothing: finditer reports non-overlapping, leftmost,
+                # first-alternative matches, so a leaf whose only occurrence
+                # overlaps another leaf's match never shows up. Hits
+                # short-circuit; misses fall through to the real search.
+                key = union_keys[arg]
+                if key is not None and key in union_hits:
+                    push(True)
+                    continue
+            lit = literals[arg]
+            if lit is not None:
+                # str.find on a required literal is far cheaper than the
+                # regex engine when the literal is absent (the common case).
+                if lower is None:
+                    lower = content.lower()
+                if lower.find(lit) < 0:
+                    push(None if op == op_search else False)
+                    continue
+            if op == op_search:
+                push(searches[arg](content))
+            else:
+                push(searches[arg](content) is not None)
+        elif op == op_jump_if_false:
+            if stk[-1]:
+                pop()
+            else:
+                pc = arg
+        elif op == op_jump_if_true:
+            if stk[-1]:
+                pc = arg
+            else:
+                pop()
+        elif op == op_not:
+            push(not pop())
+        else:  # _OP_FROM
+            r = pop()
+            if r:
+                # lastindex picks the evidence group without materializing
+                # the whole groups() tuple
+                li = r.lastindex
+                push(r.group(2) if li and li >= 2 else (r.group(1) if li else r.group(0)))
+            else:
+                push(None)
+    return stk[-1]
+
+
+def _cost(node):
+    """
+    Rough relative cost of evaluating a subtree, used to run the cheaper
+    (usually more selective) operand of a commutative operator first.
+    Unbounded quantifiers and escapes make a pattern pricier; a prescreenable
+    literal makes it cheaper, since the common miss is a str.find.
+    """
+    if isinstance(node, re.Pattern):
+        p = node.pattern
+        cost = len(p)
+        if '*' in p or '+' in p:
+            cost += 100
+        if '.' in p:
+            cost += 50
+        if '\\' in p:
+            cost += 20
+        if _extract_literal(p) is not None:
+            cost -= 40
+        return cost
+    o = node.operator
+    if o is None:
+        return _cost(node.left)
+    if o == 'NOT' or o == 'FROM':
+        return _cost(node.right) + 1
+    return _cost(node.left) + _cost(node.right) + 1
+
+
+def _ordered_operands(node):
+    """
+    Return (left, right) for a boolean-context AND/OR, cheaper side first.
+    Truthiness of 'a AND b' / 'a OR b' is symmetric, so when only truthiness
+    is observed the swap is free; ties keep the written order.
+    """
+    left, right = node.left, node.right
+    if _cost(right) < _cost(left):
+        return right, left
+    return left, right
+
+
+def _from_evidence(r):
+    """Pull the evidence out of a FROM match; see the _OP_FROM opcode."""
+    if r:
+        li = r.lastindex
+        return r.group(2) if li and li >= 2 else (r.group(1) if li else r.group(0))
+    return None
+
+
+class ContentView:
+    """
+    A piece of content plus its lowercased copy, computed once. Scanning many
+    rules over the same content through a ContentView lets the literal
+    prescreen share one lowering instead of recomputing it per rule.
+    """
+    __slots__ = ('text', 'lower')
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
 
 
 class TargetRule:
+    __slots__ = ('regex',)
+
     def __init__(self, regex):
         self.regex = regex
 
@@ -90,53 +272,78 @@ class ScanRule:
             first-few-lines-of-class-body `^\s*class\s+[a-zA-Z0-9]+.*\{([^}\n]{1,8})`
     """
 
+    __slots__ = ('name', 'left', 'operator', 'right', 'code', 'regexes', 'searches',
+                 'literals', 'union_keys', '_fn')
+
     ALL = {}
+    # Parallel arrays over ALL (names, programs, search tables), rebuilt
+    # lazily by scan_all so bulk scans stream through flat lists instead of
+    # chasing per-rule attributes. parse() invalidates them.
+    _scan_arrays = None
     BINARY_OPERATORS = ['AND', 'OR']
     UNARY_OPERATORS = ['NOT', 'FROM']
     OPERATORS = BINARY_OPERATORS + UNARY_OPERATORS
     NAME_EXPR_PAT = re.compile(r'\s*([-_.a-z0-9]+)\s*:\s*(.+)', re.I)
-    OPERATOR_PAT = re.compile('(' + '|'.join(OPERATORS) + r')\W', re.I)
+    # One compound pattern tokenizes a whole expression in a single C-level
+    # pass: whitespace, backtick regex, paren, or operator followed by a
+    # non-word char (so e.g. NOTICE is not an operator).
+    LEX_PAT = re.compile(r'\s+|`[^`]*`|[()]|(?:' + '|'.join(OPERATORS) + r')(?=\W)', re.I)
 
     @staticmethod
     def parse(definition):
 
+        def _lex_error(txt, i):
+            if txt[i] == '`':
+                raise ValueError(f'The backtick expression that started at offset {i} was not terminated.')
+            raise ValueError(f"At offset {i}, expected boolean operator but did not see one.")
+
         def _lex(txt):
+            # Tokenize with a single finditer pass; any gap between matches is
+            # text that no token rule accepted, so report an error there.
             i = 0
-            j = len(txt)
-            while True:
-                # skip current whitespace
-                while i < j and txt[i].isspace():
-                    i += 1
-                # if we have anything left...
-                if i >= j:
-                    return
-                if txt[i] == '`':
-                    end = txt.find('`', i + 1)
-                    if end > -1:
-                        yield txt[i:end + 1]
-                        i = end + 1
-                    else:
-                        raise ValueError(f'The backtick expression that started at offset {i} was not terminated.')
-                elif txt[i] in '()':
-                    yield txt[i]
-                    i += 1
-                else:
-                    m = ScanRule.OPERATOR_PAT.match(txt, i)
-                    if m:
-                        yield m.group(1).upper()
-                        i = m.end()
-                    else:
-                        raise ValueError(f"At offset {i}, expected boolean operator but did not see one.")
+            for m in ScanRule.LEX_PAT.finditer(txt):
+                if m.start() != i:
+                    _lex_error(txt, i)
+                i = m.end()
+                token = m.group(0)
+                first = token[0]
+                if first == '`' or first in '()':
+                    yield token
+                elif not first.isspace():
+                    yield token.upper()
+            if i != len(txt):
+                _lex_error(txt, i)
 
         def _parse(expr, nest=0):
+            # set_operator and set_next_operand are inlined below as direct
+            # attribute writes; the class lists are hoisted to locals. This
+            # saves a method dispatch per token, which adds up over the large
+            # rule files this is typically fed.
+            operators = frozenset(ScanRule.OPERATORS)
+            binary_operators = frozenset(ScanRule.BINARY_OPERATORS)
+            regex_cache = _REGEX_CACHE
             stack = []
             rule = ScanRule()
             stack.append(rule)
             for token in _lex(expr):
-                if token in ScanRule.OPERATORS:
-                    rule.set_operator(token)
-                elif token.startswith('`'):
-                    rule.set_next_operand(re.compile(token[1:-1]))
+                if token in operators:
+                    if rule.operator:
+                        raise ValueError(f"Extra operator, {token}, in expression.")
+                    if not rule.left and token in binary_operators:
+                        raise ValueError(f"Can't have {token} before left operand.")
+                    rule.operator = token
+                elif token[0] == '`':
+                    body = token[1:-1]
+                    operand = regex_cache.get(body)
+                    if operand is None:
+                        operand = regex_cache[body] = re.compile(body)
+                    if rule.operator:
+                        if not rule.right:
+                            rule.right = operand
+                        else:
+                            raise ValueError(f"Extra operand, {operand}, in expression.")
+                    else:
+                        rule.left = operand
                 elif token == '(':
                     if rule.right or rule.needs_operator:
                         raise ValueError("Group must be preceded by an operator.")
@@ -145,32 +352,250 @@ class ScanRule:
                 elif token == ')':
                     child = stack.pop()
                     rule = stack[-1]
-                    if not rule.left:
+                    if not rule.left and not rule.operator:
                         # This condition is caused by unnecessary parens. Remove any rule
-                        # that does nothing but hold a child.
+                        # that does nothing but hold a child. (A pending unary
+                        # operator means the parens are load-bearing: the child
+                        # is its operand.)
                         stack.pop()
                         stack.append(child)
                         rule = child
+                    elif rule.operator:
+                        if not rule.right:
+                            rule.right = child
+                        else:
+                            raise ValueError(f"Extra operand, {child}, in expression.")
                     else:
-                        rule.set_next_operand(child)
+                        rule.left = child
             if len(stack) > 1:
                 raise ValueError("Unclosed group.")
-            if rule.needs_operator:
+            if __debug__ and rule.needs_operator:
+                # sanity check only; compiled away under -O
                 assert isinstance(rule.left, re.Pattern)
             return rule
 
-        m = ScanRule.NAME_EXPR_PAT.match(definition.strip())
+        key = definition.strip()
+        hit = _PARSE_CACHE.get(key)
+        if hit is not None:
+            ScanRule.ALL[hit.name] = hit
+            ScanRule._scan_arrays = None
+            return hit
+        m = ScanRule.NAME_EXPR_PAT.match(key)
         if m:
             result = _parse(m.group(2))
-            ScanRule.ALL[m.group(1).lower()] = result
+            result._compile()
+            # interned names make the ALL lookups (and the scan_all name
+            # arrays) identity-comparable, and large rule banks share one
+            # string per name; cache hits above reuse hit.name untouched
+            result.name = sys.intern(m.group(1).lower())
+            ScanRule.ALL[result.name] = result
+            ScanRule._scan_arrays = None
+            if len(_PARSE_CACHE) >= _PARSE_CACHE_MAX:
+                _PARSE_CACHE.pop(next(iter(_PARSE_CACHE)))
+            _PARSE_CACHE[key] = result
             return result
         else:
             raise ValueError("The rule didn't consist of a name followed by an expression.")
 
+    @classmethod
+    def parse_all(cls, definitions):
+        """
+        Parse a batch of rule definitions, returning the rules in order. Use
+        this when loading a whole rule file: the per-definition caches are
+        warm for repeated leaves, and the scan arrays are rebuilt once by the
+        next scan_all instead of churning per definition.
+        """
+        return [cls.parse(definition) for definition in definitions]
+
+    @classmethod
+    def clear_all(cls):
+        """
+        Forget every registered rule and drop the parse/regex caches, so
+        long-running scanners that reload rule files don't accumulate stale
+        entries. ALL grows without bound otherwise.
+        """
+        cls.ALL.clear()
+        cls._scan_arrays = None
+        _PARSE_CACHE.clear()
+        _REGEX_CACHE.clear()
+
+    @classmethod
+    def build_combined(cls):
+        """
+        Combine every union-eligible leaf regex across registered rules into
+        one alternation, each leaf wrapped in a distinct named group. One
+        finditer pass with it tells scan_all which leaves provably occur in a
+        content; absence from the hits is inconclusive, since finditer only
+        reports non-overlapping, leftmost, first-alternative matches. Returns
+        (pattern, key_to_group), where pattern is None if no leaf is eligible.
+        """
+        groups = {}
+        for rule in cls.ALL.values():
+            for key in rule.union_keys:
+                if key is not None and key not in groups:
+                    groups[key] = f'u{len(groups)}'
+        if not groups:
+            return None, groups
+        union = re.compile('|'.join(f'(?P<{g}>{key})' for key, g in groups.items()))
+        return union, groups
+
+    @classmethod
+    def scan_all(cls, content):
+        """
+        Evaluate every registered rule against content in one tight loop.
+        Returns a list of (name, result) pairs for the rules that matched.
+        """
+        arrays = cls._scan_arrays
+        if arrays is None:
+            rules = cls.ALL
+            union, groups = cls.build_combined()
+            arrays = cls._scan_arrays = (
+                list(rules),
+                [rule.code for rule in rules.values()],
+                [rule.searches for rule in rules.values()],
+                [rule.literals for rule in rules.values()],
+                [rule.union_keys for rule in rules.values()],
+                union,
+                {group: key for key, group in groups.items()},
+            )
+        names, codes, search_tables, literal_tables, key_tables, union, group_to_key = arrays
+        if isinstance(content, ContentView):
+            content, lower = content.text, content.lower
+        else:
+            lower = content.lower()
+        hits = set()
+        if union is not None:
+            # one C-level traversal of the content covers all eligible leaves
+            total = len(group_to_key)
+            for m in union.finditer(content):
+                hits.add(m.lastgroup)
+                if len(hits) == total:
+                    break
+            hits = {group_to_key[group] for group in hits}
+        matches = []
+        for i, code in enumerate(codes):
+            result = _run(code, search_tables[i], literal_tables[i], content, lower,
+                          hits, key_tables[i])
+            if result:
+                matches.append((names[i], result))
+        return matches
+
     def __init__(self):
+        self.name = None
         self.left = None
         self.operator = None
         self.right = None
+        self.code = None
+        self.regexes = None
+        self.searches = None
+        self.literals = None
+        self.union_keys = None
+        self._fn = None
+
+    def _compile(self):
+        """
+        Flatten the parsed tree into a linear opcode program plus a table of
+        compiled regexes, so __call__ can run a single loop instead of
+        recursing through the tree.
+        """
+        code = []
+        regexes = []
+
+        def emit(node, as_bool):
+            # as_bool means only the truthiness of this subtree is observable
+            # (e.g. it feeds a NOT), so a leaf can skip building Match objects.
+            if isinstance(node, re.Pattern):
+                regexes.append(node)
+                code.append((_OP_SEARCH_BOOL if as_bool else _OP_SEARCH, len(regexes) - 1))
+                return
+            o = node.operator
+            if o is None:
+                emit(node.left, as_bool)
+            elif o == 'AND':
+                left, right = _ordered_operands(node) if as_bool else (node.left, node.right)
+                emit(left, as_bool)
+                jump = len(code)
+                code.append((_OP_JUMP_IF_FALSE, 0))
+                emit(right, as_bool)
+                code[jump] = (_OP_JUMP_IF_FALSE, len(code))
+            elif o == 'OR':
+                left, right = _ordered_operands(node) if as_bool else (node.left, node.right)
+                emit(left, as_bool)
+                jump = len(code)
+                code.append((_OP_JUMP_IF_TRUE, 0))
+                emit(right, as_bool)
+                code[jump] = (_OP_JUMP_IF_TRUE, len(code))
+            elif o == 'NOT':
+                emit(node.right, True)
+                code.append((_OP_NOT, 0))
+            else:  # FROM
+                emit(node.right, False)
+                code.append((_OP_FROM, 0))
+
+        emit(self, False)
+        self.code = tuple(code)
+        self.regexes = regexes
+        # Pre-bind the search methods; calling searches[arg](content) skips a
+        # per-opcode attribute lookup on the pattern object.
+        self.searches = [regex.search for regex in regexes]
+        self.literals = [_extract_literal(regex.pattern) for regex in regexes]
+        # Leaves with no group construct can be folded into the scan_all
+        # union regex; remember their pattern text as the union lookup key.
+        self.union_keys = [
+            regex.pattern if '(' not in regex.pattern else None for regex in regexes
+        ]
+        self._codegen()
+
+    def _codegen(self):
+        """
+        Generate a scan function specialized to this rule and compile it with
+        exec(). CPython's own bytecode for e.g. 'm and not _s1(c)' dispatches
+        more tightly than the generic opcode loop, and each regex search is a
+        LOAD_FAST of a pre-bound method. __call__ uses this function; scan_all
+        keeps the opcode program so the union prefilter can feed it.
+        """
+        ns = {'_from': _from_evidence}
+        uses_lower = False
+
+        def bind(value, prefix):
+            name = f'_{prefix}{len(ns)}'
+            ns[name] = value
+            return name
+
+        def leaf(pattern, as_bool):
+            nonlocal uses_lower
+            s = bind(pattern.search, 's')
+            lit = _extract_literal(pattern.pattern)
+            if lit is None:
+                return f'({s}(c) is not None)' if as_bool else f'{s}(c)'
+            uses_lower = True
+            l = bind(lit, 'l')
+            if as_bool:
+                return f'({l} in cl and {s}(c) is not None)'
+            return f'({s}(c) if {l} in cl else None)'
+
+        def expr(node, as_bool):
+            if isinstance(node, re.Pattern):
+                return leaf(node, as_bool)
+            o = node.operator
+            if o is None:
+                return expr(node.left, as_bool)
+            if o == 'AND' or o == 'OR':
+                if as_bool:
+                    left, right = _ordered_operands(node)
+                else:
+                    left, right = node.left, node.right
+                joiner = ' and ' if o == 'AND' else ' or '
+                return f'({expr(left, as_bool)}{joiner}{expr(right, as_bool)})'
+            if o == 'NOT':
+                return f'(not {expr(node.right, True)})'
+            return f'_from({expr(node.right, False)})'  # FROM
+
+        body = expr(self, False)
+        lower = '    if cl is None:\n        cl = c.lower()\n' if uses_lower else ''
+        src = f'def _scan(c, cl=None):\n{lower}    return {body}'
+        exec(compile(src, '<scanrule>', 'exec'), ns)
+        self._fn = ns['_scan']
 
     def set_next_operand(self, operand):
         if self.operator:
@@ -194,30 +619,18 @@ class ScanRule:
 
     def __str__(self):
         def format(operand):
-            return f"({operand})" if isinstance(operand, ScanRule) else f"`{operand.pattern}`"
+            # an attribute probe is cheaper than an isinstance MRO walk;
+            # anything without .pattern is a nested rule
+            pattern = getattr(operand, 'pattern', None)
+            return f"({operand})" if pattern is None else f"`{pattern}`"
 
         l = format(self.left) + ' ' if self.left else ''
         r = format(self.right)
         return f"{l}{self.operator} {r}"
 
     def __call__(self, content):
-        def call_or_match(regex_or_rule, content):
-            return regex_or_rule.search(content) if isinstance(regex_or_rule, re.Pattern) else regex_or_rule(content)
-
-        o = self.operator
-        if o is None or o == 'AND' or o == 'OR':
-            l = call_or_match(self.left, content)
-        if o is None:
-            return l
-        if o == 'OR':
-            if l:
-                return l
-        r = call_or_match(self.right, content)
-        if o == 'NOT':
-            return not r
-        elif o == 'FROM':
-            if r:
-                g = r.groups()
-                return g[1] if len(g) > 1 else g[0]
-        else:
-            return r
\ No newline at end of file
+        if self.code is None:
+            self._compile()
+        if isinstance(content, ContentView):
+            return self._fn(content.text, content.lower)
+        return self._fn(content)
\ No newline at end of file
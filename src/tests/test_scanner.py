@@ -1,10 +1,24 @@
-from ..scanner import ScanRule
+from ..scanner import ContentView, ScanRule
 
 easy = "easy: `test`"
 not_easy = "not_easy: not `xyz`"
 and_rule = "and_rule: `abc` and `xyz`"
 or_rule = "or_rule: `abc` or `xyz`"
 trivial_group = "tg: (`test`)"
+from_rule = "from_rule: from `a(b+)c`"
+
+
+def test_from():
+    r = ScanRule.parse(from_rule)
+    assert r("xx abbbc yy") == "bbb"
+    assert not r("zzz")
+
+
+def test_not_group():
+    r = ScanRule.parse("ng: not (`abc` and `xyz`)")
+    assert not r("abc plus xyz")
+    assert r("abc alone")
+    assert r("neither")
 
 
 def test_trivial_group():
@@ -24,6 +38,9 @@ def test_and():
     r = ScanRule.parse(and_rule)
     assert r("this is abc; after, we have xyz.")
     assert not r("this is abc; after, we have wxy.")
+    # a missing left operand must fail the AND too (the pre-opcode __call__
+    # ignored the left result and returned the right match)
+    assert not r("we only have xyz.")
 
 
 def test_not_easy():
@@ -32,6 +49,56 @@ def test_not_easy():
     assert not r("this is xyz a test.")
 
 
+def test_content_view():
+    r = ScanRule.parse(not_easy)
+    assert r(ContentView("this is a test."))
+    assert not r(ContentView("this is xyz a test."))
+
+
+def test_case_insensitive_class_not_rewritten():
+    # lowering a ranged class's endpoints would widen it: [?-z] also matches
+    # the chars between Z and a, so [?-Z] must keep its (?i) form
+    r = ScanRule.parse("ci_range: not `(?i)[?-Z]+`")
+    assert r("___")
+    assert not r("abc")
+
+
+def test_scan_all():
+    ScanRule.parse(easy)
+    ScanRule.parse(and_rule)
+    names = {name for name, match in ScanRule.scan_all("a test with abc and xyz.")}
+    assert "easy" in names
+    assert "and_rule" in names
+    names = {name for name, match in ScanRule.scan_all("nothing interesting")}
+    assert "easy" not in names
+    assert "and_rule" not in names
+
+
+def test_scan_all_overlapping_leaves():
+    # the union pass only reports leftmost non-overlapping matches, so a leaf
+    # hidden inside another leaf's match must still be found individually
+    ScanRule.parse("overlap_outer: `abc`")
+    ScanRule.parse("overlap_inner: `b`")
+    ScanRule.parse("overlap_not: not `b`")
+    names = {name for name, match in ScanRule.scan_all("abc")}
+    assert "overlap_outer" in names
+    assert "overlap_inner" in names
+    assert "overlap_not" not in names
+
+
+def test_clear_all():
+    ScanRule.parse_all([easy, or_rule])
+    assert "easy" in ScanRule.ALL
+    assert "or_rule" in ScanRule.ALL
+    ScanRule.clear_all()
+    assert not ScanRule.ALL
+    assert ScanRule.scan_all("this is a test.") == []
+
+
+def test_parse_cache():
+    assert ScanRule.parse(easy) is ScanRule.parse(easy)
+
+
 def test_easy():
     r = ScanRule.parse(easy)
     assert r("this is a test.")